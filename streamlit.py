@@ -1,3 +1,5 @@
+import io
+
 import streamlit as st
 import requests
 import pandas as pd
@@ -5,104 +7,245 @@ from datetime import datetime, timedelta
 import folium
 from streamlit_folium import st_folium
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
 from streamlit_autorefresh import st_autorefresh
 
-@st.cache_data(ttl=300)  # Cache the data for 5 minutes
+@st.cache_resource
+def get_http_session():
+    """
+    A single pooled HTTP session shared across reruns, so every data
+    refresh reuses the same TCP connection instead of reconnecting
+    """
+    return requests.Session()
+
+
+@st.cache_resource
+def get_feed_cache():
+    """
+    Holds the last feed text and its Last-Modified header so refreshes
+    can use a conditional GET and skip re-downloading an unchanged feed
+    """
+    return {}
+
+
+# Cache the data for 5 minutes; persist to disk so a server restart can
+# serve the last feed immediately instead of starting with a cold fetch
+@st.cache_data(ttl=300, persist='disk')
 def load_earthquake_data():
     # Getting Data
     url = "http://www.geophysics.geol.uoa.gr/stations/gmaps3/event_output2j.php?type=cat"
-    response = requests.get(url)
-    
-    df_list = []
-    # Split the response into columns and rows
-    line_split = response.text.split('\n')
-    for line in line_split:
-        word_split = line.split()
-        df_list.append(word_split)
-    
-    # Assign the data and column_names to our dataframe
-    df = pd.DataFrame(df_list[1:], columns=df_list[0])
-    # Remove last (unvalid) row
-    df = df.iloc[:-1]
-    
-    # Convert Lat & Long from text to float
-    df['Lat'] = df['Lat'].str.replace(',', '.').astype(float)
-    df['Long'] = df['Long'].str.replace(',', '.').astype(float)
-    df['Dep'] = df['Dep'].str.replace(',', '.').astype(float)
-    df['Mag'] = df['Mag'].str.replace(',', '.').astype(float)
-    
-    # Create one datetime column
-    df['Datetime'] = pd.to_datetime(df['Year'].astype(str) + '-' + 
-                                  df['Mo'].astype(str) + '-' + 
-                                  df['Dy'].astype(str) + ' ' + 
-                                  df['Hr'].astype(str) + ':' + 
-                                  df['Mn'].astype(str))
+
+    # Conditional GET: send If-Modified-Since when we have seen the feed
+    # before, and reuse the cached body on a 304 Not Modified
+    session = get_http_session()
+    feed_cache = get_feed_cache()
+    headers = {}
+    if 'last_modified' in feed_cache:
+        headers['If-Modified-Since'] = feed_cache['last_modified']
+    response = session.get(url, headers=headers)
+
+    if response.status_code == 304:
+        text = feed_cache['text']
+    else:
+        text = response.text
+        if 'Last-Modified' in response.headers:
+            feed_cache['last_modified'] = response.headers['Last-Modified']
+            feed_cache['text'] = text
+
+    # Parse the whole response with the C engine in one pass: whitespace
+    # separated, comma decimals converted during the parse, numeric dtypes
+    # assigned up front, invalid trailing lines skipped. Only the columns
+    # the app uses are parsed, and float32 is plenty of precision for
+    # coordinates, depth and magnitude, halving the cached frame's size
+    df = pd.read_csv(
+        io.StringIO(text), sep=r'\s+', decimal=',', engine='c',
+        usecols=['Year', 'Mo', 'Dy', 'Hr', 'Mn', 'Lat', 'Long', 'Dep', 'Mag'],
+        dtype={'Lat': np.float32, 'Long': np.float32,
+               'Dep': np.float32, 'Mag': np.float32},
+        on_bad_lines='skip'
+    )
+    # Drop any partially transmitted trailing row, then restore integer
+    # dtypes for the date parts (a short row forces them to float)
+    df = df.dropna()
+    date_parts = ['Year', 'Mo', 'Dy', 'Hr', 'Mn']
+    df[date_parts] = df[date_parts].astype(int)
+
+    # Create one datetime column, assembled directly from the integer
+    # date-part columns instead of round-tripping through strings
+    df['Datetime'] = pd.to_datetime(
+        df[date_parts].rename(columns={'Year': 'year', 'Mo': 'month',
+                                       'Dy': 'day', 'Hr': 'hour',
+                                       'Mn': 'minute'}))
     # From GMT --> Greece Time Zone
     df['Datetime'] = df['Datetime'] + pd.Timedelta(hours=2)
     
-    # Clean up the dataframe
-    cols_to_drop = ['RMS','dx','dy','dz','Np','Na','Gap','Year', 'Mo', 'Dy', 'Hr', 'Mn', 'Sec']
-    df.drop(cols_to_drop, axis=1, inplace=True)
-    
-    return df
+    # Clean up the dataframe (everything else was excluded at parse time)
+    df.drop(date_parts, axis=1, inplace=True)
+
+    # Bounds for the sidebar widgets, computed once per data refresh so a
+    # rerun pays nothing for them (returning them from here also avoids a
+    # separate cached helper, which would re-hash df on every call just to
+    # look up its cache entry)
+    mag_min = float(df['Mag'].min())
+    mag_max = float(df['Mag'].max())
+    dt_min = df['Datetime'].min()
+    dt_max = df['Datetime'].max()
 
-def get_color(date, min_date, max_date):
+    return df, mag_min, mag_max, dt_min, dt_max
+
+def compute_rgb(ts):
     """
-    Returns a color between blue (oldest) and red (newest) based on the date
+    Maps float64 timestamps to (r, b) byte arrays: the inner math of the
+    recency color scale, kept free of pandas so numba can compile it
     """
-    # Convert dates to timestamps for calculation
-    date_ts = pd.Timestamp(date).timestamp()
-    min_ts = pd.Timestamp(min_date).timestamp()
-    max_ts = pd.Timestamp(max_date).timestamp()
-    
-    # Calculate normalized position between 0 and 1
+    min_ts = ts.min()
+    max_ts = ts.max()
+
+    # Calculate normalized positions between 0 and 1
     if max_ts == min_ts:
-        position = 1
+        position = np.ones(len(ts))
     else:
-        position = (date_ts - min_ts) / (max_ts - min_ts)
-    
-    # Ensure position is within the range [0, 1]
-    position = max(0, min(1, position))
-    
+        position = (ts - min_ts) / (max_ts - min_ts)
+
     # Create RGB values
-    r = int(255 * position)
-    b = int(255 * (1 - position))
-    
-    # Convert to hex color
-    return f'#{r:02x}00{b:02x}'
+    r = (255 * position).astype(np.int64)
+    b = (255 * (1 - position)).astype(np.int64)
+    return r, b
+
+
+try:  # Optional: JIT-compile the inner math, worthwhile on large catalogs
+    from numba import njit
+    compute_rgb = njit(cache=True)(compute_rgb)
+except ImportError:
+    pass
 
+
+@st.cache_data(ttl=300)  # One palette per unique set of filtered dates
+def get_colors(dates):
+    """
+    Returns a color per date between blue (oldest) and red (newest),
+    computed over the whole datetime column in one pass
+    """
+    if len(dates) == 0:
+        return []
+
+    # Convert dates to int64 timestamps for calculation
+    ts = dates.to_numpy().view('i8').astype(np.float64)
+    r, b = compute_rgb(ts)
+
+    # Convert to hex colors with array-level string formatting instead of
+    # a Python-level format call per row
+    return np.char.add(np.char.add('#', np.char.mod('%02x', r)),
+                       np.char.add('00', np.char.mod('%02x', b)))
+
+@st.cache_data(ttl=300)  # The gradient only depends on the date span
 def create_color_scale(min_date, max_date):
-    fig, ax = plt.subplots(figsize=(8, 1))
-    
-    # Create gradient array
-    gradient = np.linspace(0, 1, 256)
-    gradient = np.vstack((gradient, gradient))
-    
-    # Create colors array
-    colors = []
-    for i in np.linspace(0, 1, 256):
-        r = int(255 * i)
-        b = int(255 * (1 - i))
-        colors.append((r/255, 0, b/255))
-    
-    # Plot gradient
-    ax.imshow(gradient, aspect='auto', cmap=mcolors.ListedColormap(colors))
-    
-    # Remove axes
-    ax.set_xticks([0, 255])
-    ax.set_xticklabels([min_date.strftime('%Y-%m-%d %H:%M'), 
-                        max_date.strftime('%Y-%m-%d %H:%M')])
-    ax.set_yticks([])
-    
-    # Add title
-    ax.set_title('Earthquake Timeline', pad=4)
-    
-    # Adjust layout
-    plt.tight_layout()
-    
-    return fig
+    """
+    Returns the timeline color scale as a static HTML/CSS gradient, which
+    the browser draws directly instead of rendering a Matplotlib figure
+    """
+    return f"""
+    <div style="background-color: #d7edeb; padding: 8px 12px; border-radius: 4px;">
+        <div style="text-align: center; font-size: 12px;">Earthquake Timeline</div>
+        <div style="height: 18px; margin: 6px 0;
+                    background: linear-gradient(to right, #0000ff, #ff0000);"></div>
+        <div style="display: flex; justify-content: space-between; font-size: 11px;">
+            <span>{min_date.strftime('%Y-%m-%d %H:%M')}</span>
+            <span>{max_date.strftime('%Y-%m-%d %H:%M')}</span>
+        </div>
+    </div>
+    """
+
+
+@st.cache_data(ttl=300)  # Serialize the CSV once per unique filter result
+def convert_to_csv(df):
+    """
+    Returns the dataframe as CSV bytes for the download button, cached so
+    reruns with unchanged filters reuse the serialized blob
+    """
+    return df.to_csv(index=False).encode('utf-8')
+
+
+@st.cache_resource(ttl=300)  # Rebuilding the map is the expensive part of a rerun
+def build_map(_filtered_df, date_range, magnitude_range):
+    """
+    Builds the Folium map for the current filter selection. The underscore
+    keeps Streamlit from hashing the dataframe itself; date_range and
+    magnitude_range act as the cache key, so repeated widget interactions
+    with unchanged filters reuse the cached map.
+    """
+    # prefer_canvas: one canvas draw for all markers instead of an SVG
+    # element per circle, which the browser struggles with at high counts
+    m = folium.Map(location=[38.3, 25], zoom_start=6, tiles='CartoDB positron',
+                   prefer_canvas=True)
+
+    # Add all earthquake points except the most recent one, as a single
+    # GeoJson layer: folium then serializes one JSON blob instead of one
+    # document per marker
+    # float64 here: json can serialize it directly, unlike float32
+    lats, lons, mags, deps = (_filtered_df[c].to_numpy(dtype=np.float64)
+                              for c in ['Lat', 'Long', 'Mag', 'Dep'])
+    dts = _filtered_df['Datetime'].to_numpy()
+    # Colors based on recency (more recent = darker), computed for all rows at once
+    colors = get_colors(_filtered_df['Datetime'])
+    # Pre-render the popup HTML for all rows: dates are formatted in one
+    # vectorized strftime pass instead of one pd.Timestamp call per marker
+    date_strs = _filtered_df['Datetime'].dt.strftime('%Y-%m-%d %H:%M').to_numpy()
+    popups = [f"""
+            <b>Date:</b> {t}<br>
+            <b>Magnitude:</b> {mag:.1f}<br>
+            <b>Depth:</b> {dep:.1f} km
+            """ for t, mag, dep in zip(date_strs, mags, deps)]
+    # Radii based on magnitude, for all markers in one vectorized pass
+    radii = mags * 1.8 + 0.6
+    features = []
+    # Computed once here: a .max() per loop iteration scans the whole column
+    newest = _filtered_df['Datetime'].max()
+    for lat, lon, radius, dt, color, popup in zip(lats, lons, radii, dts, colors, popups):
+        if dt != newest:
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': {
+                    # Radius based on magnitude, color based on recency
+                    'radius': radius,
+                    'color': str(color),
+                    'popup': popup,
+                },
+            })
+
+    if features:
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': features},
+            marker=folium.CircleMarker(fill=True, weight=0),
+            style_function=lambda feature: {
+                'radius': feature['properties']['radius'],
+                'fillColor': feature['properties']['color'],
+                'fillOpacity': 0.6,
+            },
+            popup=folium.GeoJsonPopup(fields=['popup'], labels=False, max_width=400),
+        ).add_to(m)
+
+    # Add the most recent earthquake marker
+    most_recent = _filtered_df.loc[_filtered_df['Datetime'].idxmax()]
+    radius = float(most_recent['Mag']) * 1.8 + 0.6
+    popup_content = f"""
+    <b>Date:</b> {most_recent['Datetime'].strftime('%Y-%m-%d %H:%M')}<br>
+    <b>Magnitude:</b> {most_recent['Mag']:.1f}<br>
+    <b>Depth:</b> {most_recent['Dep']:.1f} km
+    """
+
+    folium.CircleMarker(
+        location=[float(most_recent['Lat']), float(most_recent['Long'])],
+        radius=radius,
+        popup=folium.Popup(popup_content, max_width=400),
+        fill=True,
+        color='yellow',  # Outline color
+        fill_color='green',
+        fill_opacity=1,
+        weight=1
+    ).add_to(m)
+
+    return m
 
 
 #####  Building Site  #####
@@ -131,8 +274,8 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Load the data
-df = load_earthquake_data()
+# Load the data, along with the widget bounds computed at load time
+df, mag_min, mag_max, dt_min, dt_max = load_earthquake_data()
 
 # Title and description
 st.title("🌍 Earthquakes in Greece")
@@ -140,8 +283,8 @@ st.title("🌍 Earthquakes in Greece")
 st.sidebar.markdown("---")
 
 # Date range filter
-min_date = df['Datetime'].min().date()
-max_date = df['Datetime'].max().date()
+min_date = dt_min.date()
+max_date = dt_max.date()
 selected_date_range = st.sidebar.date_input(
     "Select Date Range",
     value=(min_date, max_date),
@@ -154,9 +297,9 @@ st.sidebar.markdown("---")
 # Magnitude filter
 magnitude_range = st.sidebar.slider(
     "Magnitude Range",
-    min_value=float(df['Mag'].min()),
-    max_value=float(df['Mag'].max()),
-    value=(0.0, float(df['Mag'].max())),
+    min_value=mag_min,
+    max_value=mag_max,
+    value=(0.0, mag_max),
     step=0.1
 )
 
@@ -169,13 +312,17 @@ st.sidebar.markdown("This Streamlit app provides an interactive visualization of
 # Filter the data
 if len(selected_date_range) == 2:
     start_date, end_date = selected_date_range
+    # Compare against the raw datetime64 array instead of .dt.date, which
+    # would box every row into a Python date object
+    start_ns = np.datetime64(start_date)
+    end_ns = np.datetime64(end_date) + np.timedelta64(1, 'D')
     mask = (
-        (df['Datetime'].dt.date >= start_date) & 
-        (df['Datetime'].dt.date <= end_date) &
-        (df['Mag'] >= magnitude_range[0]) &
-        (df['Mag'] <= magnitude_range[1])
+        (df['Datetime'].values >= start_ns) &
+        (df['Datetime'].values < end_ns) &
+        (df['Mag'].values >= magnitude_range[0]) &
+        (df['Mag'].values <= magnitude_range[1])
     )
-    filtered_df = df[mask]
+    filtered_df = df.iloc[mask]
 else:
     filtered_df = df
 
@@ -213,71 +360,21 @@ with col3:
     )
 
 
-# Create the map
-m = folium.Map(location=[38.3, 25], zoom_start=6, tiles='CartoDB positron')
-
-# Add all earthquake points except the most recent one
-for idx, row in filtered_df.iterrows():
-    if row['Datetime'] != filtered_df['Datetime'].max():
-        # Calculate color based on recency (more recent = darker)
-        color = get_color(row['Datetime'], filtered_df['Datetime'].min(), filtered_df['Datetime'].max())
-
-        # Calculate radius based on magnitude
-        radius = row['Mag'] * 1.8 + 0.6
-        
-        # Create popup content
-        popup_content = f"""
-        <b>Date:</b> {row['Datetime'].strftime('%Y-%m-%d %H:%M')}<br>
-        <b>Magnitude:</b> {row['Mag']:.1f}<br>
-        <b>Depth:</b> {row['Dep']:.1f} km
-        """
-        
-        # Add circle marker
-        folium.CircleMarker(
-            location=[row['Lat'], row['Long']],
-            radius=radius,
-            popup=folium.Popup(popup_content, max_width=400),
-            fill=True,
-            fill_color=color,
-            fill_opacity=0.6,
-            weight=0
-        ).add_to(m)
+# Create the map (cached per filter selection, so slider ticks that leave the
+# filters unchanged skip the rebuild entirely)
+m = build_map(filtered_df, tuple(selected_date_range), magnitude_range)
 
-# Add the most recent earthquake marker
-most_recent = filtered_df.loc[filtered_df['Datetime'].idxmax()]
-radius = most_recent['Mag'] * 1.8 + 0.6
-popup_content = f"""
-<b>Date:</b> {most_recent['Datetime'].strftime('%Y-%m-%d %H:%M')}<br>
-<b>Magnitude:</b> {most_recent['Mag']:.1f}<br>
-<b>Depth:</b> {most_recent['Dep']:.1f} km
-"""
-
-folium.CircleMarker(
-    location=[most_recent['Lat'], most_recent['Long']],
-    radius=radius,
-    popup=folium.Popup(popup_content, max_width=400),
-    fill=True,
-    color='yellow',  # Outline color
-    fill_color='green',
-    fill_opacity=1,
-    weight=1
-).add_to(m)
-
-# Display the map
-st_folium(m, width=800, height=450)
+# Display the map. The app never reads interaction state back, so ask for
+# none: otherwise every pan/zoom posts state and reruns the whole script
+st_folium(m, width=800, height=450, returned_objects=[])
 
 # Create and display color scale
 if not filtered_df.empty:
-    color_scale_fig = create_color_scale(filtered_df['Datetime'].min(), 
-                                         filtered_df['Datetime'].max())
-    color_scale_fig.patch.set_facecolor('#d7edeb')  # Set background color to light grey
-    
-    # Adjust font size
-    ax = color_scale_fig.gca()  # Get current axes
-    ax.tick_params(axis='both', which='major', labelsize=8)  # Set font size to 8 for tick labels
-    ax.set_title('Earthquake Timeline', fontsize=8, pad=10)  # Set font size to 8 for the title
-    
-    st.pyplot(color_scale_fig)
+    st.markdown(
+        create_color_scale(filtered_df['Datetime'].min(),
+                           filtered_df['Datetime'].max()),
+        unsafe_allow_html=True
+    )
 
 # Add a space
 st.markdown("---")
@@ -288,19 +385,34 @@ st.subheader("Data")
 
 
 # Display dataframe with custom index starting from 1
-st.dataframe(
+# The numeric frame is passed unchanged and formatted in the browser via
+# column_config, so client-side sorting keeps real numeric/datetime
+# semantics and no Python-side formatting runs on reruns
+table_df = (
     filtered_df.sort_values('Datetime', ascending=False)
     [['Datetime', 'Lat', 'Long', 'Mag', 'Dep']]
     .reset_index(drop=True)  # Reset index
     .set_index((np.arange(len(filtered_df)) + 1))  # Set index starting from 1
-    .style.format({
-        'Datetime': lambda x: x.strftime('%Y/%m/%d %H:%M'),
-        'Lat': '{:.4f}',
-        'Long': '{:.4f}',
-        'Mag': '{:.1f}',
-        'Dep': '{:.1f}'
-    }),
-    height=385  # Set height to 500px
+)
+
+st.dataframe(
+    table_df,
+    height=385,
+    column_config={
+        'Datetime': st.column_config.DatetimeColumn(format='YYYY/MM/DD HH:mm'),
+        'Lat': st.column_config.NumberColumn(format='%.4f'),
+        'Long': st.column_config.NumberColumn(format='%.4f'),
+        'Mag': st.column_config.NumberColumn(format='%.1f'),
+        'Dep': st.column_config.NumberColumn(format='%.1f'),
+    },
+)
+
+# Offer the filtered data as a CSV download (blob cached per filter result)
+st.download_button(
+    "Download data as CSV",
+    data=convert_to_csv(filtered_df[['Datetime', 'Lat', 'Long', 'Mag', 'Dep']]),
+    file_name="earthquakes.csv",
+    mime="text/csv"
 )
 
 st.markdown("")